@@ -5,8 +5,8 @@ __author__    = "Raul Siles"
 __email__     = "raul@dinosec.com"
 __copyright__ = "Copyright (c) 2014 DinoSec SL (www.dinosec.com)"
 __license__   = "GPL"
-__version__   = "0.42"
-__date__      = "2014-06-14"
+__version__   = "0.43"
+__date__      = "2014-07-05"
 
 import plistlib
 import argparse
@@ -14,8 +14,30 @@ import os
 import sys
 import hashlib
 import binascii
+import threading
+import time
+import socket
+import Queue
+import httplib
+import urlparse
+import zlib
+import bz2
+import struct
+import datetime
+from xml.parsers.expat import ExpatError
 from collections import defaultdict
 
+# xz support is optional (Python 2 has no built-in 'lzma' module)
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+decompression_errors = (lzma.LZMAError,) if lzma is not None else ()
+
 #
 #  Version history:
 #
@@ -27,6 +49,13 @@ from collections import defaultdict
 #   New '-x' option (--xml-schema-count)
 #   New '-X' option (--xml-schema)
 #
+# - Version v0.43: 2014-07-05
+#   New '-o' option (--mirror)
+#   New '-j' option (--jobs)
+#   New '-r' option (--limit-rate)
+#   New '-B' option (--base-url)
+#   Compressed (gzip, bzip2 & xz) and binary PLIST files, and stdin ('-f -')
+#
 
 # -- iCamasu --
 
@@ -50,8 +79,17 @@ full_details = False
 
 # File variables
 input_file = "com_apple_MobileAsset_SoftwareUpdate.xml"
+# (input file as read, and logical or decompressed PLIST file)
 filesize = 0
 filesha1 = ""
+logical_filesize = 0
+logical_filesha1 = ""
+file_format = ""
+# Read size while reading & decompressing the input file
+input_chunk_size = 64 * 1024
+
+# Parsed PLIST file (the input file is only read once)
+plist = None
 
 # URL variables
 url    = "http://mesu.apple.com/assets/com_apple_MobileAsset_SoftwareUpdate/com_apple_MobileAsset_SoftwareUpdate.xml"
@@ -96,6 +134,22 @@ xml_schema_count = False
 # Default response if an element/key is not found in a dictionary
 default_response = "None"
 
+# Mirror variables
+mirror_dir = ""
+mirror_jobs = 4
+# Global bandwidth cap in bytes per second (0 = unlimited)
+mirror_rate = 0
+# Replacement for the scheme & host of the asset URLs (e.g. a local HTTP server)
+mirror_base_url = ""
+# Read size while streaming payloads
+mirror_chunk_size = 64 * 1024
+# Extension for interrupted (partial) downloads
+mirror_partial_ext = ".part"
+
+# Shared state between mirror workers (output & bandwidth cap)
+mirror_lock = threading.Lock()
+mirror_next_slot = 0.0
+
 # ----
 
 
@@ -110,18 +164,240 @@ def warning(msg):
     print("[/] WARNING - {0}".format(msg))
 
 
-# Return file size
-def fileSize(filename):
-    try:
-        return os.path.getsize(filename)
-    except os.error as e:
-        error("File does not exist: {0} ({1})".format(filename, e))
-
+# File-like object that counts and hashes (SHA-1) every byte read from a stream,
+# with support for peeking at the first bytes (to detect the file format)
+class HashingReader(object):
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.size = 0
+        self.sha1 = hashlib.sha1()
+        self.buffer = b""
+
+    def _fill(self, size):
+        data = self.stream.read(size)
+        self.size += len(data)
+        self.sha1.update(data)
+        self.buffer += data
+        return data
+
+    def peek(self, size):
+        while len(self.buffer) < size and self._fill(size - len(self.buffer)):
+            pass
+        return self.buffer[:size]
+
+    def read(self, size=-1):
+        if size < 0:
+            while self._fill(input_chunk_size):
+                pass
+            size = len(self.buffer)
+        elif not self.buffer:
+            self._fill(size)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+# File-like object that decompresses a stream incrementally, as it is read
+# (including concatenated streams, e.g. from pigz, pbzip2 or 'cat a.gz b.gz')
+class DecompressingReader(object):
+
+    def __init__(self, stream, new_decompressor):
+        self.stream = stream
+        self.new_decompressor = new_decompressor
+        self.decompressor = new_decompressor()
+        self.buffer = b""
+        self.eof = False
+        self.padding = False
+
+    def _decompress(self, data):
+        while data:
+            if self.padding:
+                if data.strip(b"\x00"):
+                    raise IOError("Data after the zero padding of the compressed file")
+                return
+            try:
+                self.buffer += self.decompressor.decompress(data)
+                unused = self.decompressor.unused_data
+            except EOFError:
+                # The previous stream ended exactly at the end of a chunk
+                unused = data
+            if unused and not unused.strip(b"\x00"):
+                # Trailing zero bytes are ignored, as gzip(1) does
+                self.padding = True
+            elif unused:
+                # Data after the end of a stream starts a new stream
+                self.decompressor = self.new_decompressor()
+            data = unused
+
+    def read(self, size=-1):
+        while not self.eof and (size < 0 or len(self.buffer) < size):
+            data = self.stream.read(input_chunk_size)
+            if data:
+                self._decompress(data)
+            else:
+                self.eof = True
+                if hasattr(self.decompressor, "flush"):
+                    self.buffer += self.decompressor.flush()
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+# Return a function that creates decompressor objects for a compressed file
+# (based on its magic number)
+def decompressorFor(magic):
+    if magic.startswith(b"\x1f\x8b"):
+        # gzip header (16 + MAX_WBITS)
+        return "gzip", lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif magic.startswith(b"BZh"):
+        return "bzip2", bz2.BZ2Decompressor
+    elif magic.startswith(b"\xfd7zXZ\x00"):
+        if lzma is None:
+            error("The 'lzma' (or 'backports.lzma') module is required for xz files")
+        return "xz", lzma.LZMADecompressor
+    return None, None
+
+
+# Parse binary PLIST data (bplist00 format)
+def parseBinaryPlist(data, infile):
+    # Trailer: offset size, reference size, number of objects, top object & offset table
+    offset_size, ref_size, num_objects, top_object, table_offset = \
+        struct.unpack(">6xBB4xL4xL4xL", data[-32:])
+    # Check the trailer before using it (e.g. truncated files)
+    trailer_start = len(data) - 32
+    if not (1 <= offset_size <= 8 and 1 <= ref_size <= 8) or \
+            table_offset + num_objects * offset_size > trailer_start or \
+            top_object >= num_objects:
+        error("Invalid binary PLIST file (trailer): {0}".format(infile))
+    offsets = [bigEndianInt(data[table_offset + i * offset_size:table_offset + (i + 1) * offset_size])
+               for i in range(num_objects)]
+    if any(offset >= trailer_start for offset in offsets):
+        error("Invalid binary PLIST file (offset table): {0}".format(infile))
+
+    def length(info, pos):
+        # Lengths >= 15 are stored as an int object right after the marker
+        if info != 0xF:
+            return info, pos
+        size = 1 << (ord(data[pos]) & 0xF)
+        return bigEndianInt(data[pos + 1:pos + 1 + size]), pos + 1 + size
+
+    def refs(pos, count):
+        # A container cannot have more references than objects in the file
+        if count > num_objects:
+            error("Invalid binary PLIST file (container length): {0}".format(infile))
+        return [bigEndianInt(data[pos + i * ref_size:pos + (i + 1) * ref_size]) for i in range(count)]
+
+    def obj(ref):
+        pos = offsets[ref]
+        marker = ord(data[pos])
+        kind, info = marker >> 4, marker & 0xF
+        pos += 1
+        if marker == 0x08:
+            return False
+        elif marker == 0x09:
+            return True
+        elif kind == 0x0:
+            return None
+        elif kind == 0x1:
+            value = bigEndianInt(data[pos:pos + (1 << info)])
+            # 8-byte integers are signed
+            return value - (1 << 64) if info == 3 and value >= (1 << 63) else value
+        elif kind == 0x2:
+            return struct.unpack(">f" if info == 2 else ">d", data[pos:pos + (1 << info)])[0]
+        elif kind == 0x3:
+            # Seconds since 2001-01-01
+            seconds = struct.unpack(">d", data[pos:pos + 8])[0]
+            return datetime.datetime(2001, 1, 1) + datetime.timedelta(seconds=seconds)
+        elif kind == 0x4:
+            size, pos = length(info, pos)
+            return plistlib.Data(data[pos:pos + size])
+        elif kind == 0x5:
+            size, pos = length(info, pos)
+            return data[pos:pos + size]
+        elif kind == 0x6:
+            size, pos = length(info, pos)
+            return data[pos:pos + 2 * size].decode("utf-16-be")
+        elif kind == 0x8:
+            return bigEndianInt(data[pos:pos + info + 1])
+        elif kind in (0xA, 0xC):
+            size, pos = length(info, pos)
+            return [obj(r) for r in refs(pos, size)]
+        elif kind == 0xD:
+            size, pos = length(info, pos)
+            return dict(zip([obj(r) for r in refs(pos, size)],
+                            [obj(r) for r in refs(pos + size * ref_size, size)]))
+        error("Unknown object type in binary PLIST file: 0x{0:02x}".format(marker))
+
+    top = obj(top_object)
+    if not isinstance(top, dict):
+        error("Invalid binary PLIST file (top object is not a dictionary): {0}".format(infile))
+    return top
+
+
+# Return the unsigned integer value of a big-endian byte string
+def bigEndianInt(data):
+    return int(binascii.b2a_hex(data) or "0", 16)
+
+
+# Read PLIST file (only once): the file can be a XML or binary PLIST file,
+# compressed (gzip, bzip2 or xz) or not, or "-" (stdin). The file is hashed
+# and decompressed while it is read and parsed.
+def readPlist(infile):
+
+    global plist
+    global filesize
+    global filesha1
+    global logical_filesize
+    global logical_filesha1
+    global file_format
+
+    if plist is not None:
+        return plist
+
+    if infile == "-":
+        stream = sys.stdin
+        if sys.platform == "win32":
+            # Binary mode (no CRLF translation) for compressed & binary files
+            import msvcrt
+            msvcrt.setmode(stream.fileno(), os.O_BINARY)
+    else:
+        try:
+            stream = open(infile, 'rb')
+        except IOError as e:
+            error("File does not exist: {0} ({1})".format(infile, e))
+
+    raw = HashingReader(stream)
+    compression, decompressor = decompressorFor(raw.peek(6))
+    if decompressor is not None:
+        logical = HashingReader(DecompressingReader(raw, decompressor))
+    else:
+        logical = raw
 
-# Return file SHA-1 hash
-def fileSHA1(filename):
-    with open(filename, 'rb') as f:
-        return hashlib.sha1(f.read()).hexdigest()
+    try:
+        if logical.peek(8) == b"bplist00":
+            file_format = "binary"
+            plist = parseBinaryPlist(logical.read(), infile)
+        else:
+            file_format = "XML"
+            plist = plistlib.readPlist(logical)
+            # Read any trailing data, so that the hashes cover the whole file
+            while logical.read(input_chunk_size):
+                pass
+    except (IOError, EOFError, IndexError, RuntimeError, ValueError, OverflowError, struct.error, zlib.error, ExpatError) + decompression_errors as e:
+        error("Invalid PLIST file: {0} ({1})".format(infile, e))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    if compression is not None:
+        file_format += " (" + compression + ")"
+    filesize = raw.size
+    filesha1 = raw.sha1.hexdigest()
+    logical_filesize = logical.size
+    logical_filesha1 = logical.sha1.hexdigest()
+
+    return plist
 
 
 # Check if version is less than the minimum iOS version already found
@@ -153,7 +429,7 @@ def parse(infile):
 
     count = 0
 
-    plist = plistlib.readPlist(infile)
+    plist = readPlist(infile)
     #list_of_assets = plist["Assets"]
     list_of_assets = plist.get("Assets", default_response)
     #print list_of_assets
@@ -283,7 +559,7 @@ def parseXMLSchema(infile):
 
     count = 0
 
-    plist = plistlib.readPlist(infile)
+    plist = readPlist(infile)
     list_of_assets = plist.get("Assets", default_response)
     #print list_of_assets
     if list_of_assets == default_response:
@@ -415,8 +691,11 @@ def printAssets():
 # Print one-line summary of PLIST file
 def summaryOneLine():
     beta = " (beta)" if has_beta_versions else ""
-    print "%s (SHA-1: %s) = %s bytes, %s assets, %s devices, %s versions%s, min: %s, max: %s" % \
-          (input_file, filesha1, filesize, num_assets, num_devices, num_versions, beta, min_iOS_version, max_iOS_version)
+    # Logical (decompressed) details only for compressed files
+    logical = "" if filesha1 == logical_filesha1 else \
+              " [%s: SHA-1: %s = %s bytes]" % (file_format, logical_filesha1, logical_filesize)
+    print "%s (SHA-1: %s) = %s bytes%s, %s assets, %s devices, %s versions%s, min: %s, max: %s" % \
+          (input_file, filesha1, filesize, logical, num_assets, num_devices, num_versions, beta, min_iOS_version, max_iOS_version)
 
 
 # Print summary of PLIST file
@@ -429,6 +708,10 @@ def summaryFile():
     print "Filename:        %s" % input_file
     print "SHA1:            %s" % filesha1
     print "Size:            %d" % filesize
+    print "Format:          %s" % file_format
+    if filesha1 != logical_filesha1:
+        print "SHA1 (logical):  %s" % logical_filesha1
+        print "Size (logical):  %d" % logical_filesize
     print "# Assets:        %d" % num_assets
     print "# Devices:       %d" % num_devices
     print "# iOS versions:  %d%s" % (num_versions, beta)
@@ -497,6 +780,238 @@ def printXMLSchemaCount(infile):
     print num_entries
 
 
+#  MIRROR FUNCTIONS:
+# -------------------
+
+# Get the (unique) set of assets to mirror for a specific device or iOS version:
+# {local path: (download URL, asset details)}
+# (assets are replicated per device, so the same payload appears several times)
+def mirrorAssets(this_device="", this_ios_version=""):
+    selected = {}
+    for dev in sorted(assets):
+        if this_device and dev != this_device:
+            continue
+        for entry in assets[dev]:
+            for version in entry.keys():
+                if this_ios_version and version != this_ios_version:
+                    continue
+                details = entry[version]
+                if not details['url'].startswith(("http://", "https://")):
+                    warning("Invalid URL for {0} ({1}): {2}".format(dev, version, details['url']))
+                    continue
+                # The local path only depends on the original URL (not on '-B'),
+                # and different URLs for the same path are downloaded only once
+                filename = mirrorPath(details['url'])
+                if filename is None:
+                    warning("Unsafe URL for {0} ({1}): {2}".format(dev, version, details['url']))
+                    continue
+                if filename in selected:
+                    continue
+                asset_url = details['url']
+                if mirror_base_url:
+                    # Keep the path, but fetch it from a different server
+                    parts = urlparse.urlsplit(asset_url)
+                    asset_url = mirror_base_url.rstrip("/") + urlparse.urlunsplit(("", "", parts.path, parts.query, ""))
+                selected[filename] = (asset_url, details)
+    return selected
+
+
+# Local path for an asset URL (the server directory structure is mirrored)
+# or None if the URL would be stored outside the mirror directory
+def mirrorPath(asset_url):
+    parts = urlparse.urlsplit(asset_url)
+    # Drop empty, '.' and '..' segments (the PLIST file is fetched over plain HTTP)
+    segments = [s for s in [parts.netloc.replace(":", "_")] + parts.path.split("/")
+                if s not in ("", ".", "..")]
+    if len(segments) < 2:
+        return None
+    root = os.path.abspath(mirror_dir)
+    path = os.path.abspath(os.path.join(root, *segments))
+    if not path.startswith(root + os.sep):
+        return None
+    return path
+
+
+# Wait until the global bandwidth cap allows transferring nbytes more bytes
+def mirrorThrottle(nbytes):
+    global mirror_next_slot
+    if not mirror_rate:
+        return
+    with mirror_lock:
+        now = time.time()
+        slot = max(mirror_next_slot, now)
+        mirror_next_slot = slot + float(nbytes) / mirror_rate
+    if slot > now:
+        time.sleep(slot - now)
+
+
+# Print a mirror status line (workers share stdout)
+def mirrorStatus(msg):
+    with mirror_lock:
+        print(msg)
+        sys.stdout.flush()
+
+
+# Send a GET request over a persistent connection (reconnect once if it was closed)
+def mirrorRequest(connections, asset_url, headers):
+    parts = urlparse.urlsplit(asset_url)
+    key = (parts.scheme, parts.netloc)
+    path = urlparse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+    for attempt in (1, 2):
+        conn = connections.get(key)
+        if conn is None:
+            if parts.scheme == "https":
+                conn = httplib.HTTPSConnection(parts.netloc, timeout=60)
+            else:
+                conn = httplib.HTTPConnection(parts.netloc, timeout=60)
+            connections[key] = conn
+        try:
+            conn.request("GET", path, headers=headers)
+            return conn.getresponse()
+        except (httplib.HTTPException, socket.error):
+            conn.close()
+            del connections[key]
+            if attempt == 2:
+                raise
+
+
+# Download a single asset, resuming any partial download, and validate its hash
+# (the payload is hashed while it is streamed to disk)
+def mirrorDownload(connections, filename, asset_url, details):
+    partial = filename + mirror_partial_ext
+    expected_hash = details['hash']
+    expected_size = details['downloadSize']
+
+    if os.path.exists(filename) and \
+            (expected_size == default_response or os.path.getsize(filename) == expected_size):
+        return "skipped (already mirrored)"
+
+    dirname = os.path.dirname(filename)
+    if not os.path.isdir(dirname):
+        try:
+            os.makedirs(dirname)
+        except os.error:
+            # Another worker could have created it meanwhile
+            if not os.path.isdir(dirname):
+                raise
+
+    # Hash the bytes already downloaded (if any) to resume from there
+    sha1 = hashlib.sha1()
+    offset = 0
+    if os.path.exists(partial):
+        with open(partial, 'rb') as f:
+            for data in iter(lambda: f.read(mirror_chunk_size), b""):
+                sha1.update(data)
+                offset += len(data)
+
+    headers = {}
+    if offset:
+        headers['Range'] = "bytes={0}-".format(offset)
+    response = mirrorRequest(connections, asset_url, headers)
+
+    if response.status == 416 and offset:
+        # The partial file is already complete
+        response.read()
+    elif response.status in (200, 206):
+        if response.status == 200 and offset:
+            # The server ignored the range request: start from scratch
+            sha1 = hashlib.sha1()
+            offset = 0
+        elif response.status == 206 and mirrorRangeStart(response) != offset:
+            # The server answered from a different offset: start from scratch
+            response.read()
+            if not offset:
+                return "failed (unexpected Content-Range: {0})".format(response.getheader("Content-Range"))
+            os.remove(partial)
+            return mirrorDownload(connections, filename, asset_url, details)
+        with open(partial, 'ab' if offset else 'wb') as f:
+            for data in iter(lambda: response.read(mirror_chunk_size), b""):
+                mirrorThrottle(len(data))
+                f.write(data)
+                sha1.update(data)
+                offset += len(data)
+    else:
+        response.read()
+        return "failed (HTTP {0} {1})".format(response.status, response.reason)
+
+    if expected_size != default_response and offset != expected_size:
+        if offset > expected_size:
+            os.remove(partial)
+        return "failed (size {0}, expected {1})".format(offset, expected_size)
+
+    digest = sha1.hexdigest()
+    if details['hashFormat'] == "SHA-1" and expected_hash != default_response and digest != expected_hash:
+        os.remove(partial)
+        return "failed (SHA-1 {0}, expected {1})".format(digest, expected_hash)
+
+    os.rename(partial, filename)
+    return "downloaded ({0} bytes)".format(offset)
+
+
+# Return the first byte position of a 206 (Partial Content) response, or None
+def mirrorRangeStart(response):
+    # Content-Range: bytes <start>-<end>/<total>
+    content_range = response.getheader("Content-Range", "")
+    try:
+        unit, positions = content_range.split(None, 1)
+        if unit.lower() != "bytes":
+            return None
+        return int(positions.split("-", 1)[0])
+    except ValueError:
+        return None
+
+
+# Mirror worker: download assets from the queue until it is empty
+def mirrorWorker(queue, results):
+    # One persistent connection per server and worker
+    connections = {}
+    while True:
+        try:
+            count, filename, asset_url, details = queue.get_nowait()
+        except Queue.Empty:
+            break
+        try:
+            result = mirrorDownload(connections, filename, asset_url, details)
+        except (httplib.HTTPException, socket.error, IOError, os.error) as e:
+            result = "failed ({0})".format(e)
+        results[filename] = result
+        mirrorStatus("[%d] %s: %s" % (count, asset_url, result))
+    for conn in connections.values():
+        conn.close()
+
+
+# Download the ZIP payloads for a specific device or iOS version (or all)
+def mirror(this_device="", this_ios_version=""):
+    selected = mirrorAssets(this_device, this_ios_version)
+    if not quiet:
+        print "- Mirroring %d files into %s: " % (len(selected), mirror_dir)
+        print ""
+
+    queue = Queue.Queue()
+    for count, filename in enumerate(sorted(selected)):
+        asset_url, details = selected[filename]
+        queue.put((count + 1, filename, asset_url, details))
+
+    results = {}
+    workers = []
+    for i in range(min(mirror_jobs, len(selected))):
+        worker = threading.Thread(target=mirrorWorker, args=(queue, results))
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+    # Join with a timeout so that Ctrl-C still interrupts the main thread
+    for worker in workers:
+        while worker.is_alive():
+            worker.join(1)
+
+    failed = len([r for r in results.values() if r.startswith("failed")])
+    if not quiet:
+        print ""
+        print "Files: %d, failed: %d" % (len(selected), failed)
+    # Return number of failed downloads
+    return failed
+
+
 #  MAIN:
 # -------
 
@@ -520,13 +1035,27 @@ if __name__ == "__main__":
                         help="Increase output verbosity (default = off).")
     parser.add_argument("-q", "--quiet", action="store_true",
                         help="Do not show headers and other details (default = off).")
-    parser.add_argument("-f", "--file", help="iOS software update PLIST file:\n" +
-                        "(e.g. com_apple_MobileAsset_SoftwareUpdate.xml)")
+    parser.add_argument("-f", "--file", help="iOS software update PLIST file, '-' for stdin:\n" +
+                        "(e.g. com_apple_MobileAsset_SoftwareUpdate.xml[.gz|.bz2|.xz])\n" +
+                        "(.xz files require the 'backports.lzma' module on Python 2)")
     parser.add_argument("-V", "--version", action='version', version=__version__,
                         help="Show version information and exit.")
     parser.add_argument("-F", "--full-details", action="store_true",
                                  help="Show full details for assets.")
 
+    # Mirror options
+    parser.add_argument("-o", "--mirror", metavar="DIR",
+                        help="Download the ZIP payloads of the assets into this directory.\n" +
+                        "(optional: use with '-d' or '-i' to select the assets;\n" +
+                        " other output selectors cannot be used with '-o')")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="Number of concurrent downloads (default = %d)." % mirror_jobs)
+    parser.add_argument("-r", "--limit-rate", type=int, metavar="KBPS",
+                        help="Global bandwidth cap for downloads in KB/s (default = unlimited).")
+    parser.add_argument("-B", "--base-url",
+                        help="Download the assets from this server instead:\n" +
+                        "(e.g. http://localhost:8000)")
+
     # Output selectors
     group_selectors = parser.add_mutually_exclusive_group()
     group_selectors.add_argument("-s", "--summary", action="store_true",
@@ -570,6 +1099,30 @@ if __name__ == "__main__":
     if args.full_details:
         full_details = args.full_details
 
+    if args.mirror is not None:
+        if not args.mirror:
+            error("The mirror directory cannot be empty")
+        if args.summary or args.file_summary or args.summary_by_device or \
+                args.summary_by_ios_version or args.min_version or args.max_version or \
+                args.both_versions or args.xml_schema or args.xml_schema_count:
+            error("Only the '-d' or '-i' selectors can be used with '-o' (--mirror)")
+        mirror_dir = args.mirror
+        if args.jobs is not None:
+            if args.jobs < 1:
+                error("The number of concurrent downloads must be at least 1: {0}".format(args.jobs))
+            mirror_jobs = args.jobs
+        if args.limit_rate is not None:
+            if args.limit_rate < 0:
+                error("The bandwidth cap cannot be negative: {0}".format(args.limit_rate))
+            mirror_rate = args.limit_rate * 1024
+        if args.base_url is not None:
+            base_url = urlparse.urlsplit(args.base_url)
+            if base_url.scheme not in ("http", "https") or not base_url.netloc:
+                error("Invalid base URL (e.g. http://localhost:8000): {0}".format(args.base_url))
+            mirror_base_url = args.base_url
+    elif args.jobs is not None or args.limit_rate is not None or args.base_url is not None:
+        error("The '-j', '-r' and '-B' options can only be used with '-o' (--mirror)")
+
     if args.device is not None:
         device = args.device
     elif args.ios_version is not None:
@@ -597,9 +1150,8 @@ if __name__ == "__main__":
         summary = True
 
 
-    # Process PLIST file
-    filesize = fileSize(input_file)
-    filesha1 = fileSHA1(input_file)
+    # Read PLIST file (and get its size & SHA-1 hash)
+    readPlist(input_file)
 
     # Parse PLIST file (and get total number of assets or entries)
     num_assets = parse(input_file)
@@ -614,7 +1166,14 @@ if __name__ == "__main__":
     # Sort iOS beta versions list
     beta_versions.sort()
 
-    if device: # If is not an empty string
+    if mirror_dir: # If is not an empty string
+        # Download the selected assets (device and iOS version act as filters)
+        if not quiet:
+            print
+            print(header)
+        if mirror(device, ios_version):
+            sys.exit(1)
+    elif device: # If is not an empty string
         if not verbose:
             summaryiOSVersionsFor(device)
         else: